@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Log filtered RPLidar scans as json.
+
+Reads scans from an RPLidar on the given serial port, filters each scan
+to an angle/distance window, tags the nearest and farthest measurements
+and writes one json document per scan to stdout.
+
+Usage:
+    python3 log_lidar_pi.py --number 10 --min-angle 300 --max-angle 60
+"""
+import argparse
+import json
+import time
+from math import ceil, floor, pi
+
+import numpy as np
+from rplidar import RPLidar
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_PORT = "/dev/ttyUSB0"
+DEFAULT_BAUDRATE = 115200
+MAX_DISTANCE_MM = 12000.0  # slamtec A1 is rated to about 12 meters
+
+_DEG2RAD = pi / 180.0
+
+#
+# per-degree lookup tables for the binned scan filter; computed once at
+# module load so filter_lidar_data() does no trig per scan.
+#
+_ANGLES = np.arange(360)
+_RAD = _ANGLES * _DEG2RAD
+# exp(i*r) computes cos and sin with a single sincos argument
+# reduction: the real part is cos, the imaginary part is sin.  float32
+# is plenty of precision for millimeter distances and halves the
+# bandwidth of the x/y multiplies.
+_CIS = np.exp(1j * _RAD)
+_COS = _CIS.real.astype(np.float32)
+_SIN = _CIS.imag.astype(np.float32)
+
+
+def _dumps(lidar_data):
+    """
+    Serialize one scan document to a json string.  orjson formats
+    floats much faster than the stdlib encoder, so use it when it is
+    installed and fall back to json otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(lidar_data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(lidar_data, indent=2)
+
+
+def filter_lidar_data(scan_data, min_angle=0, max_angle=360,
+                      min_distance=0, max_distance=MAX_DISTANCE_MM):
+    """
+    Filter a binned scan.
+
+    scan_data is a 360 element numpy array of distances in whole
+    millimeters (int16 is plenty for the lidar's ~12m range) indexed
+    by whole degrees; a zero means no return at that angle.
+    Returns (filtered_data, nearest, farthest) where filtered_data is a
+    list of measurement dicts and nearest/farthest are the measurements
+    with the smallest/largest distance in the window (or None if the
+    window is empty).
+
+    The whole filter is vectorized; the per-degree cos/sin tables are
+    computed once at module load so each call is a handful of numpy
+    operations on fixed 360 element arrays rather than a python loop.
+    """
+    # the bins are whole degrees, so the angle window is just a slice;
+    # a narrow field of view then only touches the bins it covers
+    lo = max(0, int(ceil(min_angle)))
+    hi = min(360, int(floor(max_angle)) + 1)
+    if lo >= hi:
+        return [], None, None
+
+    distances = scan_data[lo:hi]
+    mask = (distances >= min_distance) & (distances <= max_distance)
+    x = distances * _COS[lo:hi]
+    y = distances * _SIN[lo:hi]
+
+    filtered_data = [
+        {"angle": float(a), "distance": float(d), "x": float(px), "y": float(py)}
+        for a, d, px, py in zip(_ANGLES[lo:hi][mask], distances[mask],
+                                x[mask], y[mask])
+    ]
+
+    nearest = None
+    farthest = None
+    if filtered_data:
+        # integer sentinels keep the argmin/argmax from promoting the
+        # int16 distances to float
+        i = int(np.argmin(np.where(mask, distances, 32767)))
+        j = int(np.argmax(np.where(mask, distances, -1)))
+        nearest = {"angle": float(lo + i), "distance": float(distances[i]),
+                   "x": float(x[i]), "y": float(y[i])}
+        farthest = {"angle": float(lo + j), "distance": float(distances[j]),
+                    "x": float(x[j]), "y": float(y[j])}
+    return filtered_data, nearest, farthest
+
+
+def _filter_core(angles, distances, min_angle, max_angle,
+                 min_distance, max_distance):
+    """
+    Numeric core of filter_lidar_scan(): apply the angle/distance
+    window, convert to cartesian and locate the nearest and farthest
+    returns.  Returns (angles, distances, x, y, near_index, far_index)
+    with the indexes -1 when the window is empty.
+    """
+    mask = ((angles >= min_angle) & (angles <= max_angle)
+            & (distances >= min_distance) & (distances <= max_distance))
+    angles = angles[mask]
+    distances = distances[mask]
+    if ne is not None:
+        # numexpr fuses the degree conversion, trig and multiply into
+        # one pass over the arrays instead of three temporaries
+        x = ne.evaluate("distances * cos(angles * _DEG2RAD)")
+        y = ne.evaluate("distances * sin(angles * _DEG2RAD)")
+    else:
+        # one complex exp gives cos (real) and sin (imaginary) from a
+        # single sincos pass instead of two separate trig calls
+        cis = np.exp(1j * (angles * _DEG2RAD))
+        x = distances * cis.real
+        y = distances * cis.imag
+    if distances.size == 0:
+        return angles, distances, x, y, -1, -1
+    return (angles, distances, x, y,
+            int(np.argmin(distances)), int(np.argmax(distances)))
+
+
+if njit is not None:
+    # when numba is installed replace the core outright with a
+    # jit-compiled version; native code already fuses the passes, so
+    # the numexpr branch only matters for the interpreted fallback
+    @njit(cache=True, fastmath=True)
+    def _filter_core(angles, distances, min_angle, max_angle,  # noqa: F811
+                     min_distance, max_distance):
+        mask = ((angles >= min_angle) & (angles <= max_angle)
+                & (distances >= min_distance) & (distances <= max_distance))
+        angles = angles[mask]
+        distances = distances[mask]
+        radians = angles * _DEG2RAD
+        x = distances * np.cos(radians)
+        y = distances * np.sin(radians)
+        if distances.size == 0:
+            return angles, distances, x, y, -1, -1
+        return (angles, distances, x, y,
+                int(np.argmin(distances)), int(np.argmax(distances)))
+
+
+def filter_lidar_scan(scan, min_angle=0, max_angle=360,
+                      min_distance=0, max_distance=MAX_DISTANCE_MM,
+                      sorted=False):
+    """
+    Filter one scan as read from the lidar.
+
+    scan is a list of (quality, angle, distance) tuples with angle in
+    degrees and distance in millimeters.  Returns (filtered_data,
+    nearest, farthest) like filter_lidar_data(), except angles keep
+    their sub-degree precision.  If sorted is True the filtered
+    measurements are kept in ascending angle order.
+    """
+    filtered_data = []
+    nearest = None
+    farthest = None
+    if scan:
+        # pull the scan apart into numpy arrays and hand the numeric
+        # work to _filter_core (native code when numba is installed)
+        angles = np.fromiter((a for _, a, _ in scan),
+                             dtype=np.float64, count=len(scan))
+        distances = np.fromiter((d for _, _, d in scan),
+                                dtype=np.float64, count=len(scan))
+        angles, distances, x, y, i, j = _filter_core(
+            angles, distances,
+            float(min_angle), float(max_angle),
+            float(min_distance), float(max_distance))
+        # the filtered measurements live in the parallel numpy arrays;
+        # only wrap them in dicts once, at the end
+        filtered_data = [
+            {"angle": float(a), "distance": float(d),
+             "x": float(px), "y": float(py)}
+            for a, d, px, py in zip(angles, distances, x, y)
+        ]
+        if sorted:
+            # one O(n log n) sort beats inserting each point into a
+            # sorted list, which shifts the list on every insert
+            filtered_data.sort(key=lambda m: m["angle"])
+        if i >= 0:
+            nearest = {"angle": float(angles[i]), "distance": float(distances[i]),
+                       "x": float(x[i]), "y": float(y[i])}
+            farthest = {"angle": float(angles[j]), "distance": float(distances[j]),
+                        "x": float(x[j]), "y": float(y[j])}
+    return filtered_data, nearest, farthest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log filtered RPLidar scans as json")
+    parser.add_argument("-p", "--port", type=str, default=DEFAULT_PORT,
+                        help="serial port the lidar is connected to")
+    parser.add_argument("-b", "--baudrate", type=int, default=DEFAULT_BAUDRATE,
+                        help="baud rate of the serial port")
+    parser.add_argument("-n", "--number", type=int, default=0,
+                        help="number of scans to log, 0 to log until interrupted")
+    parser.add_argument("-a", "--min-angle", type=float, default=0,
+                        help="minimum angle in degrees to include")
+    parser.add_argument("-A", "--max-angle", type=float, default=360,
+                        help="maximum angle in degrees to include")
+    parser.add_argument("-d", "--min-distance", type=float, default=0,
+                        help="minimum distance in millimeters to include")
+    parser.add_argument("-D", "--max-distance", type=float, default=MAX_DISTANCE_MM,
+                        help="maximum distance in millimeters to include")
+    parser.add_argument("--bin-degrees", action="store_true",
+                        help="bin measurements to whole degrees before filtering")
+    parser.add_argument("--sorted", action="store_true",
+                        help="sort filtered measurements by angle")
+    args = parser.parse_args()
+
+    lidar = RPLidar(args.port, baudrate=args.baudrate)
+    scan_data = np.zeros(360, dtype=np.int16)
+    scan_count = 0
+    try:
+        for scan in lidar.iter_scans():
+            now = time.time()
+            if args.bin_degrees:
+                scan_data[:] = 0
+                for _, angle, distance in scan:
+                    scan_data[int(angle) % 360] = int(distance)
+                filtered_data, nearest, farthest = filter_lidar_data(
+                    scan_data,
+                    args.min_angle, args.max_angle,
+                    args.min_distance, args.max_distance)
+            else:
+                filtered_data, nearest, farthest = filter_lidar_scan(
+                    scan,
+                    args.min_angle, args.max_angle,
+                    args.min_distance, args.max_distance,
+                    sorted=args.sorted)
+            lidar_data = {
+                "scan": scan_count,
+                "time": now,
+                "measurements": filtered_data,
+                "nearest": nearest,
+                "farthest": farthest,
+            }
+            print(_dumps(lidar_data))
+            scan_count += 1
+            if args.number > 0 and scan_count >= args.number:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        lidar.stop()
+        lidar.stop_motor()
+        lidar.disconnect()
+
+
+if __name__ == "__main__":
+    main()
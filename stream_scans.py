@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Buffer RPLidar measurements and emit complete scans as json.
+
+Measurements are collected into a ring buffer as they are read from
+the lidar; when a scan completes (and no more often than --rate times
+per second) the buffered scan is written to stdout as one json
+document.
+
+Usage:
+    python3 stream_scans.py --number 10 --rate 5 > scans.json
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from math import pi
+
+import numpy as np
+from rplidar import RPLidar
+
+DEFAULT_PORT = "/dev/ttyUSB0"
+DEFAULT_BAUDRATE = 115200
+MAX_DISTANCE_MM = 12000.0  # slamtec A1 is rated to about 12 meters
+
+# more than enough slots for one full scan at the A1's best resolution
+BUFFER_SIZE = 2048
+
+# the A1 spins at about 10 revolutions per second
+SCAN_RATE_HZ = 10.0
+
+#
+# 0.1 degree cos/sin lookup tables.  The lidar reports sub-degree
+# angles but 0.1 degree quantization is plenty for plotting, and two
+# table lookups are much cheaper than calling cos()/sin() on every
+# measurement (~8000/sec at full rate).
+#
+_LUT_RAD = np.arange(3600) * pi / 1800.0
+COS_LUT = np.cos(_LUT_RAD)
+SIN_LUT = np.sin(_LUT_RAD)
+
+
+def _norm360(a):
+    """
+    Normalize an angle no more than one turn out of range to [0, 360);
+    two compares are cheaper than the fmod behind the % operator.
+    """
+    if a >= 360.0:
+        return a - 360.0
+    if a < 0.0:
+        return a + 360.0
+    return a
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buffer RPLidar measurements and emit scans as json")
+    parser.add_argument("-p", "--port", type=str, default=DEFAULT_PORT,
+                        help="serial port the lidar is connected to")
+    parser.add_argument("-b", "--baudrate", type=int, default=DEFAULT_BAUDRATE,
+                        help="baud rate of the serial port")
+    parser.add_argument("-n", "--number", type=int, default=0,
+                        help="number of scans to read, 0 to read until interrupted")
+    parser.add_argument("-R", "--rate", type=float, default=10.0,
+                        help="maximum number of scans emitted per second")
+    parser.add_argument("-f", "--forward-angle", type=float, default=0.0,
+                        help="angle in degrees that is 'forward' on the vehicle")
+    parser.add_argument("-r", "--reverse-spin", action="store_true",
+                        help="lidar is mounted upside down, so angles increase clockwise")
+    parser.add_argument("-d", "--min-distance", type=float, default=0,
+                        help="minimum distance in millimeters to include")
+    parser.add_argument("-D", "--max-distance", type=float, default=MAX_DISTANCE_MM,
+                        help="maximum distance in millimeters to include")
+    parser.add_argument("--pretty", action="store_true",
+                        help="indent each measurement for human reading; "
+                             "the default is compact machine-readable output")
+    args = parser.parse_args()
+    args.forward_angle %= 360.0
+
+    lidar = RPLidar(args.port, baudrate=args.baudrate)
+
+    # collect the formatted scan and write it with a single syscall;
+    # a buffered rewrap of stdout avoids per-line flushes
+    out = io.TextIOWrapper(sys.stdout.buffer,
+                           write_through=False, line_buffering=False)
+    out_buf = []
+    # fixed-size ring buffer; each row is one measurement as
+    # (scan, index, overall, time, distance, angle, x, y) so filling a
+    # slot is a single row assignment with no per-point allocation
+    measurement_buffer = np.empty((BUFFER_SIZE, 8), dtype=np.float64)
+    measurement_index = 0   # next slot to fill in the ring buffer
+    measurement_count = 0   # measurements buffered for the current scan
+    overall_index = 0       # measurements read since startup
+    full_scan_count = 0
+    full_scan_index = 0     # index of the measurement within its scan
+    last_emit_time = 0.0
+    try:
+        if args.rate <= SCAN_RATE_HZ:
+            # at or below the lidar's spin rate every emitted scan is
+            # complete, so let the driver assemble whole scans and skip
+            # the per-measurement new_scan and ring buffer bookkeeping
+            for scan in lidar.iter_scans():
+                now = time.time()
+                full_scan_count += 1
+                if (now - last_emit_time) >= 1.0 / args.rate:
+                    out_buf.append('{"scan": [\n')
+                    full_scan_index = 0
+                    for quality, angle, distance in scan:
+                        if distance < args.min_distance or distance > args.max_distance:
+                            continue
+                        if args.reverse_spin:
+                            angle = _norm360(360.0 - angle - args.forward_angle)
+                        else:
+                            angle = _norm360(angle - args.forward_angle)
+                        i = int(angle * 10.0) % 3600
+                        x = distance * COS_LUT[i]
+                        y = distance * SIN_LUT[i]
+                        if args.pretty:
+                            out_buf.append(json.dumps(
+                                {"scan": full_scan_count, "index": full_scan_index,
+                                 "overall": overall_index, "time": now,
+                                 "distance": distance, "angle": angle,
+                                 "x": float(x), "y": float(y)}, indent=2) + ",\n")
+                        else:
+                            out_buf.append(
+                                f'{{"scan":{full_scan_count},"index":{full_scan_index},'
+                                f'"overall":{overall_index},"time":{now},'
+                                f'"distance":{distance},"angle":{angle},'
+                                f'"x":{x},"y":{y}}},\n')
+                        full_scan_index += 1
+                        overall_index += 1
+                    out_buf.append(']}\n')
+                    out.write(''.join(out_buf))
+                    out_buf.clear()
+                    last_emit_time = now
+                if args.number > 0 and full_scan_count >= args.number:
+                    break
+            return
+        for new_scan, quality, angle, distance in lidar.iter_measures():
+            now = time.time()
+            if new_scan:
+                # emit the buffered scan if the rate allows it
+                if measurement_count > 0 and (now - last_emit_time) >= 1.0 / args.rate:
+                    # the schema is fixed, so format the json by hand
+                    # rather than running every measurement through
+                    # json.dumps
+                    out_buf.append('{"scan": [\n')
+                    if args.pretty:
+                        for m in measurement_buffer[:measurement_count]:
+                            out_buf.append(json.dumps(
+                                {"scan": int(m[0]), "index": int(m[1]),
+                                 "overall": int(m[2]), "time": float(m[3]),
+                                 "distance": float(m[4]), "angle": float(m[5]),
+                                 "x": float(m[6]), "y": float(m[7])},
+                                indent=2) + ",\n")
+                    else:
+                        for m in measurement_buffer[:measurement_count]:
+                            out_buf.append(
+                                f'{{"scan":{int(m[0])},"index":{int(m[1])},'
+                                f'"overall":{int(m[2])},"time":{m[3]},'
+                                f'"distance":{m[4]},"angle":{m[5]},'
+                                f'"x":{m[6]},"y":{m[7]}}},\n')
+                    out_buf.append(']}\n')
+                    out.write(''.join(out_buf))
+                    out_buf.clear()
+                    last_emit_time = now
+                full_scan_count += 1
+                full_scan_index = 0
+                measurement_index = 0
+                measurement_count = 0
+                if args.number > 0 and full_scan_count > args.number:
+                    break
+            # the lidar reports distance 0 for no-return beams; reject
+            # those and out-of-range points before doing any angle math
+            if distance < args.min_distance or distance > args.max_distance:
+                continue
+            if args.reverse_spin:
+                angle = _norm360(360.0 - angle - args.forward_angle)
+            else:
+                angle = _norm360(angle - args.forward_angle)
+            i = int(angle * 10.0) % 3600
+            x = distance * COS_LUT[i]
+            y = distance * SIN_LUT[i]
+            measurement_buffer[measurement_index] = (
+                full_scan_count, full_scan_index, overall_index,
+                now, distance, angle, x, y)
+            measurement_index = (measurement_index + 1) % BUFFER_SIZE
+            measurement_count = min(measurement_count + 1, BUFFER_SIZE)
+            full_scan_index += 1
+            overall_index += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.flush()
+        lidar.stop()
+        lidar.stop_motor()
+        lidar.disconnect()
+
+
+if __name__ == "__main__":
+    main()